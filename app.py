@@ -1,67 +1,117 @@
 """
 OpenAI Status Monitor — Web App
 ================================
-Install:  pip install feedparser aiohttp flask flask-sock
-Run:      python app.py
+Install:  pip install feedparser aiohttp quart xxhash orjson
+          pip install uvloop   (optional, not available on Windows)
+Run:      hypercorn app:app --bind 0.0.0.0:5000 --worker-class uvloop
+     or:  python app.py   (Quart's development server)
 Open:     http://localhost:5000
 """
 
 import asyncio
 import re
-import hashlib
-import json
-import threading
+import itertools
 import feedparser
 import aiohttp
+import orjson
+import xxhash
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from flask import Flask, render_template, request, jsonify
-from flask_sock import Sock
+from quart import Quart, Response, render_template, request, jsonify, websocket
 
-app = Flask(__name__)
-sock = Sock(app)
+try:
+    import uvloop          # faster event loop; not available on Windows
+except ImportError:
+    uvloop = None
+
+app = Quart(__name__)
 
 # ── Global state ──────────────────────────────────────────────
 active_feeds = []          # list of {name, url}
-monitor_thread = None
-monitor_running = False
-connected_clients = set()  # WebSocket clients
-incidents_log = []         # all incidents seen so far (for new clients)
+monitor_running = False    # what /api/status reports
+monitor_task = None        # asyncio.Task running run_monitor()
+connected_clients = set()  # outbound asyncio.Queue of each WebSocket client
+incidents_log = deque(maxlen=1000)  # newest first (for new clients)
+reported_keys = {}         # title|link hashes shown so far, oldest first; all feeds
+# Pre-encoded /api/status body and /ws replay frame, rebuilt whenever the
+# state they show changes
+status_snapshot = b'{"running":false,"feeds":[],"incidents":[]}'
+hello_payload = None       # None while there is nothing to replay
+# feedparser is synchronous; parse off the event loop, capped so it can't
+# crowd out the default executor aiohttp uses for DNS
+parse_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="feedparse")
 
 CHECK_INTERVAL = 30
+CLIENT_QUEUE_SIZE = 256
+REPORTED_KEYS_MAX = 4096
+SEEN_IDS_MAX = 4096
+SESSION_HEADERS = {
+    "User-Agent": "OpenAI-Status-Monitor/1.0",
+    "Connection": "keep-alive",
+}
+
+# Most specific first; the earliest product with any keyword present wins
+PRODUCT_KEYWORDS = {
+    "Chat Completions / ChatGPT": ["chat completions", "chatgpt", "chat"],
+    "Responses API":              ["responses api"],
+    "Assistants API":             ["assistants api", "assistants"],
+    "Embeddings":                 ["embeddings"],
+    "Fine-tuning":                ["fine-tun"],
+    "DALL-E / Images API":        ["dall-e", "image generation", "images api"],
+    "Whisper / Audio API":        ["whisper", "audio", "speech"],
+    "Realtime API":               ["realtime"],
+    "Batch API":                  ["batch"],
+    "OpenAI API":                 ["api"],
+}
+
+_TAG_RE = re.compile(r"<[^>]+>")
+_WS_RE  = re.compile(r"\s+")
+_ENTITIES = (("&nbsp;", " "), ("&amp;", "&"),
+             ("&lt;", "<"), ("&gt;", ">"), ("&#39;", "'"))
 
 
 # ── Helpers ───────────────────────────────────────────────────
 
-def content_hash(text):
-    return hashlib.md5(text.encode()).hexdigest()
+@dataclass
+class Incident:
+    """One incident as logged and sent to clients; orjson encodes it as an object."""
+    # Spelled out rather than dataclass(slots=True), which needs Python 3.10
+    __slots__ = ("ts", "provider", "product", "title", "detail", "link", "is_new")
+
+    ts:       str
+    provider: str
+    product:  str
+    title:    str
+    detail:   str
+    link:     str
+    is_new:   bool
+
+
+async def read_and_hash(resp):
+    """Read a response body, hashing each chunk as it arrives."""
+    h = xxhash.xxh3_64()
+    chunks = []
+    async for chunk in resp.content.iter_chunked(16384):
+        h.update(chunk)
+        chunks.append(chunk)
+    return b"".join(chunks), h.hexdigest()
 
 
 def extract_product(title, content):
     combined = (title + " " + content).lower()
-    product_map = {
-        "Chat Completions / ChatGPT": ["chat completions", "chatgpt", "chat"],
-        "Responses API":              ["responses api"],
-        "Assistants API":             ["assistants api", "assistants"],
-        "Embeddings":                 ["embeddings"],
-        "Fine-tuning":                ["fine-tun"],
-        "DALL-E / Images API":        ["dall-e", "image generation", "images api"],
-        "Whisper / Audio API":        ["whisper", "audio", "speech"],
-        "Realtime API":               ["realtime"],
-        "Batch API":                  ["batch"],
-        "OpenAI API":                 ["api"],
-    }
-    for product, keywords in product_map.items():
+    for product, keywords in PRODUCT_KEYWORDS.items():
         if any(kw in combined for kw in keywords):
             return product
     return "Platform"
 
 
 def clean_html(raw):
-    text = re.sub(r"<[^>]+>", " ", raw)
-    for entity, char in [("&nbsp;", " "), ("&amp;", "&"),
-                          ("&lt;", "<"), ("&gt;", ">"), ("&#39;", "'")]:
+    text = _TAG_RE.sub(" ", raw)
+    for entity, char in _ENTITIES:
         text = text.replace(entity, char)
-    return re.sub(r"\s+", " ", text).strip()
+    return _WS_RE.sub(" ", text).strip()
 
 
 def get_timestamp(entry):
@@ -72,35 +122,96 @@ def get_timestamp(entry):
     return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
 
-def broadcast(msg_type, data):
-    """Send a message to all connected WebSocket clients."""
-    payload = json.dumps({"type": msg_type, "data": data})
-    dead = set()
-    for ws in connected_clients:
+def build_incident(e, provider, is_new):
+    content_raw = ""
+    if hasattr(e, "content") and e.content:
+        content_raw = e.content[0].value
+    elif hasattr(e, "summary"):
+        content_raw = e.summary
+    content = clean_html(content_raw)
+    return Incident(
+        ts       = get_timestamp(e),
+        provider = provider,
+        product  = extract_product(e.get("title",""), content),
+        title    = e.get("title","No title"),
+        detail   = content[:400],
+        link     = e.get("link","#"),
+        is_new   = is_new,
+    )
+
+
+def remember(keys, key, limit):
+    """Add `key` to an insertion-ordered dict used as a set, evicting the
+    oldest key past `limit`. Returns True if `key` was already there."""
+    if key in keys:
+        return True
+    keys[key] = None
+    if len(keys) > limit:
+        del keys[next(iter(keys))]
+    return False
+
+
+def already_reported(e):
+    """Record an entry; True if any feed has already reported the same one."""
+    key = xxhash.xxh3_64_intdigest(f"{e.get('title','')}|{e.get('link','')}".encode())
+    return remember(reported_keys, key, REPORTED_KEYS_MAX)
+
+
+def enqueue(q, payload):
+    """Queue a payload for one client, dropping its oldest message if full."""
+    while True:
         try:
-            ws.send(payload)
-        except Exception:
-            dead.add(ws)
-    connected_clients.difference_update(dead)
+            q.put_nowait(payload)
+            return
+        except asyncio.QueueFull:
+            try:
+                q.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+
+
+def refresh_snapshots():
+    global status_snapshot, hello_payload
+    recent = list(itertools.islice(incidents_log, 50))
+    status_snapshot = orjson.dumps({
+        "running": monitor_running,
+        "feeds": active_feeds,
+        "incidents": recent
+    })
+    hello_payload = None
+    if recent:
+        hello_payload = orjson.dumps({"type": "incidents_batch",
+                                      "data": recent[:20]}).decode()
+
+
+def broadcast(msg_type, data):
+    """Queue a message for every connected WebSocket client.
+
+    Each client's handler does its own sends, so a slow client only backs
+    up its own queue. Must be called from the event loop.
+    """
+    # Decoded so clients still get text frames for JSON.parse
+    payload = orjson.dumps({"type": msg_type, "data": data}).decode()
+    for q in connected_clients:
+        enqueue(q, payload)
 
 
 # ── Core async monitor ────────────────────────────────────────
 
 async def watch_feed(session, feed_cfg):
-    global incidents_log
     name      = feed_cfg["name"]
     url       = feed_cfg["url"]
     etag      = None
     last_mod  = None
     last_hash = None
-    seen_ids  = set()
+    seen_ids  = {}         # entry ids, oldest first, capped at SEEN_IDS_MAX
     first_run = True
 
     broadcast("log", {"msg": f"▶ Starting watcher for {name}", "level": "info"})
 
-    while monitor_running:
+    while True:
         try:
-            headers = {"User-Agent": "OpenAI-Status-Monitor/1.0"}
+            headers = {}
             if etag:     headers["If-None-Match"]     = etag
             if last_mod: headers["If-Modified-Since"] = last_mod
 
@@ -114,7 +225,7 @@ async def watch_feed(session, feed_cfg):
                     })
 
                 elif resp.status == 200:
-                    body        = await resp.text()
+                    body, current_hash = await read_and_hash(resp)
                     server_etag = resp.headers.get("ETag")
                     server_lmod = resp.headers.get("Last-Modified")
                     etag_support = bool(server_etag or server_lmod)
@@ -122,18 +233,20 @@ async def watch_feed(session, feed_cfg):
                     if server_etag: etag     = server_etag
                     if server_lmod: last_mod = server_lmod
 
-                    current_hash = content_hash(body)
-                    if not first_run and not etag_support:
-                        if current_hash == last_hash:
-                            broadcast("log", {
-                                "msg": f"{name}: Hash unchanged — no new incidents",
-                                "level": "ok"
-                            })
-                            await asyncio.sleep(CHECK_INTERVAL)
-                            continue
+                    # Checked even when validators are sent: some origins ignore
+                    # them and re-send an unchanged 200, which needn't be parsed
+                    if not first_run and current_hash == last_hash:
+                        broadcast("log", {
+                            "msg": f"{name}: Hash unchanged — no new incidents",
+                            "level": "ok"
+                        })
+                        await asyncio.sleep(CHECK_INTERVAL)
+                        continue
                     last_hash = current_hash
 
-                    feed    = feedparser.parse(body)
+                    loop    = asyncio.get_running_loop()
+                    feed    = await loop.run_in_executor(parse_executor,
+                                                         feedparser.parse, body)
                     entries = feed.entries
 
                     if first_run:
@@ -141,57 +254,32 @@ async def watch_feed(session, feed_cfg):
                             "msg": f"Connected to {name} — {len(entries)} incidents in history. ETag: {'supported' if etag_support else 'not supported, using hash fallback'}",
                             "level": "info"
                         })
-                        if entries:
-                            e = entries[0]
-                            content_raw = ""
-                            if hasattr(e, "content") and e.content:
-                                content_raw = e.content[0].value
-                            elif hasattr(e, "summary"):
-                                content_raw = e.summary
-                            content = clean_html(content_raw)
-                            incident = {
-                                "ts":      get_timestamp(e),
-                                "provider": name,
-                                "product": extract_product(e.get("title",""), content),
-                                "title":   e.get("title","No title"),
-                                "detail":  content[:400],
-                                "link":    e.get("link","#"),
-                                "is_new":  False
-                            }
-                            incidents_log.insert(0, incident)
+                        if entries and not already_reported(entries[0]):
+                            incident = build_incident(entries[0], name, is_new=False)
+                            incidents_log.appendleft(incident)
+                            refresh_snapshots()
                             broadcast("incident", incident)
 
-                        for e in entries:
-                            seen_ids.add(e.get("id") or e.get("link",""))
+                        for e in reversed(entries):
+                            remember(seen_ids, e.get("id") or e.get("link",""), SEEN_IDS_MAX)
                         first_run = False
 
                     else:
+                        # Walk oldest first: eviction then drops the oldest ids,
+                        # and the client's prepend leaves the newest on top
                         new_entries = []
-                        for e in entries:
+                        for e in reversed(entries):
                             uid = e.get("id") or e.get("link","")
-                            if uid not in seen_ids:
+                            if not remember(seen_ids, uid, SEEN_IDS_MAX) \
+                                    and not already_reported(e):
                                 new_entries.append(e)
-                                seen_ids.add(uid)
 
                         if new_entries:
-                            for e in reversed(new_entries):
-                                content_raw = ""
-                                if hasattr(e, "content") and e.content:
-                                    content_raw = e.content[0].value
-                                elif hasattr(e, "summary"):
-                                    content_raw = e.summary
-                                content = clean_html(content_raw)
-                                incident = {
-                                    "ts":       get_timestamp(e),
-                                    "provider": name,
-                                    "product":  extract_product(e.get("title",""), content),
-                                    "title":    e.get("title","No title"),
-                                    "detail":   content[:400],
-                                    "link":     e.get("link","#"),
-                                    "is_new":   True
-                                }
-                                incidents_log.insert(0, incident)
-                                broadcast("incident", incident)
+                            batch = [build_incident(e, name, is_new=True)
+                                     for e in new_entries]
+                            incidents_log.extendleft(batch)
+                            refresh_snapshots()
+                            broadcast("incidents_batch", batch)
                         else:
                             broadcast("log", {
                                 "msg": f"{name}: Monitoring... no new incidents",
@@ -208,84 +296,87 @@ async def watch_feed(session, feed_cfg):
 
 
 async def run_monitor():
-    connector = aiohttp.TCPConnector(limit=50)
-    async with aiohttp.ClientSession(connector=connector) as session:
+    # Keep connections and DNS answers alive across polls so each check
+    # doesn't pay for a fresh lookup and TLS handshake.
+    connector = aiohttp.TCPConnector(limit=50, limit_per_host=10,
+                                     ttl_dns_cache=300, keepalive_timeout=75,
+                                     force_close=False)
+    async with aiohttp.ClientSession(connector=connector,
+                                     headers=SESSION_HEADERS) as session:
         await asyncio.gather(*[watch_feed(session, cfg) for cfg in active_feeds])
 
 
-def start_monitor_thread():
-    global monitor_running
-    monitor_running = True
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
-    loop.run_until_complete(run_monitor())
+def stop_monitor():
+    """Cancel the running monitor, if any."""
+    # Cancelling (rather than flagging) also aborts a request, body read or
+    # parse that is in flight, so a stopped run can't touch shared state
+    if monitor_task is not None:
+        monitor_task.cancel()
 
 
-# ── Flask routes ──────────────────────────────────────────────
+# ── Quart routes ──────────────────────────────────────────────
 
 @app.route("/")
-def index():
-    return render_template("index.html")
+async def index():
+    return await render_template("index.html")
 
 
 @app.route("/api/start", methods=["POST"])
-def api_start():
-    global active_feeds, monitor_thread, monitor_running, incidents_log
+async def api_start():
+    global active_feeds, monitor_running, monitor_task
 
-    data = request.json
+    data = await request.get_json()
     feeds = data.get("feeds", [])
 
     if not feeds:
         return jsonify({"error": "No feeds provided"}), 400
 
     # Stop existing monitor if running
-    monitor_running = False
-    incidents_log = []
-
+    stop_monitor()
+    incidents_log.clear()
+    reported_keys.clear()
     active_feeds = feeds
+    monitor_running = True
+    refresh_snapshots()
 
-    monitor_thread = threading.Thread(target=start_monitor_thread, daemon=True)
-    monitor_thread.start()
+    monitor_task = asyncio.create_task(run_monitor())
 
     return jsonify({"status": "started", "feeds": len(feeds)})
 
 
 @app.route("/api/stop", methods=["POST"])
-def api_stop():
+async def api_stop():
     global monitor_running
+    stop_monitor()
     monitor_running = False
+    refresh_snapshots()
     broadcast("log", {"msg": "Monitor stopped by user.", "level": "warn"})
     return jsonify({"status": "stopped"})
 
 
 @app.route("/api/status")
-def api_status():
-    return jsonify({
-        "running": monitor_running,
-        "feeds": active_feeds,
-        "incidents": incidents_log[:50]
-    })
+async def api_status():
+    return Response(status_snapshot, mimetype="application/json")
 
 
-@sock.route("/ws")
-def websocket(ws):
-    connected_clients.add(ws)
-    # Send existing incidents to newly connected client
-    for inc in incidents_log[:20]:
-        try:
-            ws.send(json.dumps({"type": "incident", "data": inc}))
-        except Exception:
-            break
+@app.websocket("/ws")
+async def ws():
+    await websocket.accept()
+    q = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+    connected_clients.add(q)
     try:
+        # Send existing incidents to newly connected client, as one frame
+        if hello_payload:
+            await websocket.send(hello_payload)
+        # This handler is the client's writer; Quart cancels it on disconnect
         while True:
-            ws.receive(timeout=60)   # keep alive
-    except Exception:
-        pass
+            await websocket.send(await q.get())
     finally:
-        connected_clients.discard(ws)
+        connected_clients.discard(q)
 
 
 if __name__ == "__main__":
     import os
     port = int(os.environ.get("PORT", 5000))
-    app.run(debug=False, host="0.0.0.0", port=port, threaded=True)
+    loop = uvloop.new_event_loop() if uvloop else None
+    app.run(debug=False, host="0.0.0.0", port=port, loop=loop, use_reloader=False)